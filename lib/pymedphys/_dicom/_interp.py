@@ -0,0 +1,123 @@
+# Copyright (C) 2022 PyMedPhys Contributors
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Numba kernels for interpolating within equally spaced dose grids."""
+
+import functools
+
+from pymedphys._imports import numba
+from pymedphys._imports import numpy as np
+
+
+def uniform_axis_parameters(axis):
+    """Determine the origin and spacing of an equally spaced axis.
+
+    Parameters
+    ----------
+    axis : numpy.ndarray
+        A 1D array of grid coordinates.
+
+    Returns
+    -------
+    (origin, spacing) or None
+        ``None`` is returned when the axis is not equally spaced or
+        contains fewer than two points.
+    """
+    axis = np.asarray(axis, dtype=np.float64)
+    if len(axis) < 2:
+        return None
+
+    spacing = (axis[-1] - axis[0]) / (len(axis) - 1)
+    if spacing == 0 or not np.allclose(np.diff(axis), spacing):
+        return None
+
+    return float(axis[0]), float(spacing)
+
+
+def trilinear(dose, z0, dz, y0, dy, x0, dx, qz, qy, qx, out):
+    """Trilinearly interpolate ``dose`` on the grid defined by the
+    ``qz``, ``qy`` and ``qx`` axes.
+
+    As the query points form a grid, the interpolation is separable.
+    The grid cell index and interpolation weight along each axis are
+    determined once per axis value rather than once per query point,
+    leaving only the eight corner weighted sum to be evaluated for each
+    point.
+
+    Query values outside of the grid are clamped to its edges, callers
+    are responsible for masking those points if a fill value is wanted.
+
+    Parameters
+    ----------
+    dose : numpy.ndarray
+        The 3D dose grid in DICOM ``(z, y, x)`` order.
+    z0, dz, y0, dy, x0, dx : float
+        The origin and spacing of each of the grid axes.
+    qz, qy, qx : numpy.ndarray
+        1D arrays of the query axes.
+    out : numpy.ndarray
+        A preallocated array of shape ``(len(qz), len(qy), len(qx))``
+        into which the result is written.
+    """
+    nz, ny, nx = dose.shape
+
+    iz, tz = _indices_and_weights(qz, z0, dz, nz)
+    iy, ty = _indices_and_weights(qy, y0, dy, ny)
+    ix, tx = _indices_and_weights(qx, x0, dx, nx)
+
+    _compiled_trilinear()(dose, iz, tz, iy, ty, ix, tx, out)
+
+
+def _indices_and_weights(q, q0, dq, n):
+    fractional_index = np.clip((np.asarray(q, dtype=np.float64) - q0) / dq, 0, n - 1)
+    indices = np.minimum(np.floor(fractional_index).astype(np.intp), n - 2)
+    weights = fractional_index - indices
+
+    return indices, weights
+
+
+@functools.lru_cache()
+def _compiled_trilinear():
+    # Compilation is deferred until first use so that importing
+    # pymedphys does not also require importing numba. The compiled
+    # kernel is cached to disk so that later sessions, such as short
+    # CLI invocations, do not pay the compilation cost again. As with
+    # the scanline kernel, the GIL is released rather than using
+    # parallel=True, as Numba's workqueue threading layer aborts the
+    # process when a parallel kernel is called from multiple threads.
+    return numba.njit(nogil=True, fastmath=True, cache=True)(_trilinear)
+
+
+def _trilinear(dose, iz, tz, iy, ty, ix, tx, out):
+    for i in range(iz.shape[0]):
+        z = iz[i]
+        wz = tz[i]
+
+        for j in range(iy.shape[0]):
+            y = iy[j]
+            wy = ty[j]
+
+            for k in range(ix.shape[0]):
+                x = ix[k]
+                wx = tx[k]
+
+                c00 = dose[z, y, x] * (1 - wx) + dose[z, y, x + 1] * wx
+                c01 = dose[z, y + 1, x] * (1 - wx) + dose[z, y + 1, x + 1] * wx
+                c10 = dose[z + 1, y, x] * (1 - wx) + dose[z + 1, y, x + 1] * wx
+                c11 = dose[z + 1, y + 1, x] * (1 - wx) + dose[z + 1, y + 1, x + 1] * wx
+
+                c0 = c00 * (1 - wy) + c01 * wy
+                c1 = c10 * (1 - wy) + c11 * wy
+
+                out[i, j, k] = c0 * (1 - wz) + c1 * wz
@@ -0,0 +1,76 @@
+# Copyright (C) 2022 PyMedPhys Contributors
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A Numba scanline kernel for rasterising contours onto a dose grid."""
+
+import functools
+
+from pymedphys._imports import numba
+from pymedphys._imports import numpy as np
+
+
+def scanline_fill(xs, ys, x_axis, y_axis, out):
+    """Fill the grid points of a plane which lie within a polygon.
+
+    Each row of the grid is intersected with every edge of the polygon
+    and the points between alternating pairs of crossings are filled.
+    This follows the same even-odd crossing rule as
+    ``matplotlib.path.Path.contains_points``, so the two agree for all
+    grid points that do not lie exactly on the polygon boundary.
+
+    Parameters
+    ----------
+    xs, ys : numpy.ndarray
+        The vertices of the polygon. The polygon is implicitly closed.
+    x_axis : numpy.ndarray
+        The x coordinates of the grid columns, in ascending order.
+    y_axis : numpy.ndarray
+        The y coordinates of the grid rows.
+    out : numpy.ndarray
+        A boolean array of shape ``(len(y_axis), len(x_axis))`` within
+        which the points inside of the polygon are set to True.
+    """
+    _compiled_scanline_fill()(xs, ys, x_axis, y_axis, out)
+
+
+@functools.lru_cache()
+def _compiled_scanline_fill():
+    # The kernel releases the GIL so that separate contours can be
+    # rasterised concurrently across threads. As with the interpolation
+    # kernel, it is compiled on first use and cached to disk.
+    return numba.njit(nogil=True, fastmath=True, cache=True)(_scanline_fill)
+
+
+def _scanline_fill(xs, ys, x_axis, y_axis, out):
+    num_vertices = xs.shape[0]
+    crossings = np.empty(num_vertices, dtype=np.float64)
+
+    for row in range(y_axis.shape[0]):
+        y = y_axis[row]
+        num_crossings = 0
+
+        for i in range(num_vertices):
+            j = (i + 1) % num_vertices
+            if (ys[i] >= y) != (ys[j] >= y):
+                crossings[num_crossings] = xs[i] + (y - ys[i]) * (xs[j] - xs[i]) / (
+                    ys[j] - ys[i]
+                )
+                num_crossings += 1
+
+        row_crossings = np.sort(crossings[:num_crossings])
+
+        for k in range(0, num_crossings - 1, 2):
+            start = np.searchsorted(x_axis, row_crossings[k])
+            stop = np.searchsorted(x_axis, row_crossings[k + 1])
+            out[row, start:stop] = True
@@ -16,6 +16,7 @@
 from copy import deepcopy
 
 from packaging import version
+from pymedphys._imports import numpy as np
 from pymedphys._imports import pydicom
 
 from . import anonymise, coords, create
@@ -94,7 +95,9 @@ class DicomDose(DicomBase):
 
     @property
     def values(self):
-        return self.dataset.pixel_array * self.dataset.DoseGridScaling
+        return self.dataset.pixel_array.astype(np.float32, copy=False) * np.float32(
+            self.dataset.DoseGridScaling
+        )
 
     @property
     def units(self):
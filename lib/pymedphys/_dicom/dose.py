@@ -14,14 +14,15 @@
 
 """A DICOM RT Dose toolbox"""
 
+import concurrent.futures
 import copy
-from typing import Sequence
+import weakref
+from typing import Any, Dict, Sequence, Tuple
 
-from pymedphys._imports import matplotlib
 from pymedphys._imports import numpy as np
 from pymedphys._imports import plt, pydicom, scipy
 
-from . import orientation
+from . import _interp, _scanline, orientation
 from .coords import coords_in_datasets_are_equal, xyz_axes_from_dataset
 from .header import patient_ids_in_datasets_are_equal
 from .rtplan import get_surface_entry_point_with_fallback, require_gantries_be_zero
@@ -31,52 +32,218 @@ from .structure import pull_structure
 
 
 def zyx_and_dose_from_dataset(dataset):
-    x, y, z = xyz_axes_from_dataset(dataset)
-    coords = (z, y, x)
-    dose = dose_from_dataset(dataset)
+    """Extract the coordinates and dose grid from a DICOM RT Dose file.
+
+    The dose grid is returned as a new, writeable, float64 array which
+    the caller is free to modify.
+    """
+    coords = _zyx_from_dataset(dataset)
+    dose = dose_from_dataset(dataset).astype(np.float64)
 
     return coords, dose
 
 
+def _zyx_from_dataset(dataset):
+    x, y, z = xyz_axes_from_dataset(dataset)
+
+    return z, y, x
+
+
+# Cache of decoded dose grids keyed by the id of the dataset they were
+# read from. Entries are removed once their dataset has been garbage
+# collected, so a cached grid never outlives its dataset. Each entry
+# also stores the PixelData and DoseGridScaling it was created from so
+# that a dataset which is modified after first being read is decoded
+# afresh.
+_DOSE_CACHE: Dict[int, Tuple[bytes, Any, "np.ndarray"]] = {}
+
+
 def dose_from_dataset(ds, set_transfer_syntax_uid=True):
-    r"""Extract the dose grid from a DICOM RT Dose file."""
+    r"""Extract the dose grid from a DICOM RT Dose file.
+
+    The returned grid is a read-only float32 array which is cached for
+    the lifetime of ``ds`` so that repeated calls on the same dataset
+    avoid decoding and scaling the pixel data again. Copy the result
+    before modifying it in place.
+    """
 
     if set_transfer_syntax_uid:
         ds.file_meta.TransferSyntaxUID = pydicom.uid.ImplicitVRLittleEndian
 
-    dose = ds.pixel_array * ds.DoseGridScaling
+    key = id(ds)
+
+    if key in _DOSE_CACHE:
+        pixel_data, dose_grid_scaling, dose = _DOSE_CACHE[key]
+        if pixel_data is ds.PixelData and dose_grid_scaling == ds.DoseGridScaling:
+            return dose
+    else:
+        weakref.finalize(ds, _DOSE_CACHE.pop, key, None)
+
+    dose = ds.pixel_array.astype(np.float32, copy=False) * np.float32(
+        ds.DoseGridScaling
+    )
+    dose.flags.writeable = False
+
+    _DOSE_CACHE[key] = (ds.PixelData, ds.DoseGridScaling, dose)
 
     return dose
 
 
+class DoseInterpolator:
+    """Interpolates within a DICOM RT Dose dataset.
+
+    The dose grid is extracted from the dataset and the interpolation
+    set up once upon construction. Many profiles or depth doses can then
+    be interpolated from the one dataset without repeating that work.
+
+    Parameters
+    ----------
+    dose_dataset : pydicom.dataset.Dataset
+        The RT DICOM dose dataset to be interpolated
+    """
+
+    def __init__(self, dose_dataset):
+        self.dose_dataset = dose_dataset
+        self.coords = _zyx_from_dataset(dose_dataset)
+        self.dose = dose_from_dataset(dose_dataset)
+
+        self._axes_parameters = [
+            _interp.uniform_axis_parameters(axis) for axis in self.coords
+        ]
+        self._is_uniform = all(
+            parameters is not None for parameters in self._axes_parameters
+        )
+        self._regular_grid_interpolator = None
+
+    def __call__(self, interp_coords):
+        """Interpolates the dose at ``interp_coords``.
+
+        See `dicom_dose_interpolate()` for details.
+        """
+        interp_z, interp_y, interp_x = [np.asarray(item) for item in interp_coords]
+
+        if interp_z.ndim == interp_y.ndim == interp_x.ndim == 1:
+            # The Numba kernel only handles equally spaced grids, fall
+            # back to scipy for anything else.
+            if self._is_uniform:
+                return self._interpolate_grid(interp_z, interp_y, interp_x)
+
+            points = (
+                interp_z[:, None, None],
+                interp_y[None, :, None],
+                interp_x[None, None, :],
+            )
+        else:
+            points = tuple(np.broadcast_arrays(interp_z, interp_y, interp_x))
+
+        if self._regular_grid_interpolator is None:
+            self._regular_grid_interpolator = scipy.interpolate.RegularGridInterpolator(
+                self.coords,
+                self.dose,
+                method="linear",
+                bounds_error=False,
+                fill_value=0.0,
+            )
+
+        return self._regular_grid_interpolator(points)
+
+    def _interpolate_grid(self, interp_z, interp_y, interp_x):
+        (z0, dz), (y0, dy), (x0, dx) = self._axes_parameters
+
+        result = np.empty((len(interp_z), len(interp_y), len(interp_x)))
+        _interp.trilinear(
+            self.dose, z0, dz, y0, dy, x0, dx, interp_z, interp_y, interp_x, result
+        )
+
+        # Match the scipy fallback, which fills points outside of the
+        # dose grid with zero rather than raising.
+        query_axes = (interp_z, interp_y, interp_x)
+        for dimension, (axis, points) in enumerate(zip(self.coords, query_axes)):
+            outside = (points < np.min(axis)) | (points > np.max(axis))
+            if np.any(outside):
+                index = [slice(None)] * 3
+                index[dimension] = outside
+                result[tuple(index)] = 0.0
+
+        return result
+
+    def depth_dose(self, depths, plan_dataset):
+        """Interpolates dose for defined depths within the dose dataset.
+
+        See `depth_dose()` for details.
+        """
+        orientation.require_dicom_patient_position(self.dose_dataset, "HFS")
+        require_gantries_be_zero(plan_dataset)
+        depths = np.array(depths, copy=False)
+
+        surface_entry_point = get_surface_entry_point_with_fallback(plan_dataset)
+        depth_adjust = surface_entry_point.y
+
+        y = depths + depth_adjust
+        x, z = [surface_entry_point.x], [surface_entry_point.z]
+
+        coords = (z, y, x)
+
+        extracted_dose = np.squeeze(self(coords))
+
+        return extracted_dose
+
+    def profile(self, displacements, depth, direction, plan_dataset):
+        """Interpolates dose for cardinal angle horizontal profiles within
+        the dose dataset.
+
+        See `profile()` for details.
+        """
+        orientation.require_dicom_patient_position(self.dose_dataset, "HFS")
+        require_gantries_be_zero(plan_dataset)
+        displacements = np.array(displacements, copy=False)
+
+        surface_entry_point = get_surface_entry_point_with_fallback(plan_dataset)
+        depth_adjust = surface_entry_point.y
+        y = [depth + depth_adjust]
+
+        if direction in ("inplane", "inline"):
+            coords = (
+                displacements + surface_entry_point.z,
+                y,
+                [surface_entry_point.x],
+            )
+        elif direction in ("crossplane", "crossline"):
+            coords = (
+                [surface_entry_point.z],
+                y,
+                displacements + surface_entry_point.x,
+            )
+        else:
+            raise ValueError(
+                "Expected direction to be equal to one of "
+                "'inplane', 'inline', 'crossplane', or 'crossline'"
+            )
+
+        extracted_dose = np.squeeze(self(coords))
+
+        return extracted_dose
+
+
 def dicom_dose_interpolate(interp_coords, dicom_dose_dataset):
     """Interpolates across a DICOM dose dataset.
 
+    Points which lie outside of the dose grid are given a dose of zero,
+    no error is raised.
+
     Parameters
     ----------
     interp_coords : tuple(z, y, x)
         A tuple of coordinates in DICOM order, z axis first, then y, then x
-        where x, y, and z are DICOM axes.
+        where x, y, and z are DICOM axes. If each of these is 1D they are
+        treated as the axes of a grid upon which to interpolate.
+        Otherwise they are broadcast against each other and treated as
+        scattered points.
     dose : pydicom.Dataset
         An RT DICOM Dose object
     """
 
-    interp_z = np.array(interp_coords[0], copy=False)[:, None, None]
-    interp_y = np.array(interp_coords[1], copy=False)[None, :, None]
-    interp_x = np.array(interp_coords[2], copy=False)[None, None, :]
-
-    coords, dicom_dose_dataset = zyx_and_dose_from_dataset(dicom_dose_dataset)
-    interpolation = scipy.interpolate.RegularGridInterpolator(
-        coords, dicom_dose_dataset
-    )
-
-    try:
-        result = interpolation((interp_z, interp_y, interp_x))
-    except ValueError:
-        print(f"coords: {coords}")
-        raise
-
-    return result
+    return DoseInterpolator(dicom_dose_dataset)(interp_coords)
 
 
 def depth_dose(depths, dose_dataset, plan_dataset):
@@ -91,6 +258,9 @@ def depth_dose(depths, dose_dataset, plan_dataset):
     have gantry angle equal to 0 (head up). Depth is assumed to be
     purely in the y axis direction in DICOM coordinates.
 
+    Depths which lie outside of the dose grid are given a dose of zero,
+    no error is raised.
+
     Parameters
     ----------
     depths : numpy.ndarray
@@ -105,21 +275,8 @@ def depth_dose(depths, dose_dataset, plan_dataset):
         The RT DICOM plan used to extract surface parameters and verify gantry
         angle 0 beams are used.
     """
-    orientation.require_dicom_patient_position(dose_dataset, "HFS")
-    require_gantries_be_zero(plan_dataset)
-    depths = np.array(depths, copy=False)
-
-    surface_entry_point = get_surface_entry_point_with_fallback(plan_dataset)
-    depth_adjust = surface_entry_point.y
-
-    y = depths + depth_adjust
-    x, z = [surface_entry_point.x], [surface_entry_point.z]
 
-    coords = (z, y, x)
-
-    extracted_dose = np.squeeze(dicom_dose_interpolate(coords, dose_dataset))
-
-    return extracted_dose
+    return DoseInterpolator(dose_dataset).depth_dose(depths, plan_dataset)
 
 
 def profile(displacements, depth, direction, dose_dataset, plan_dataset):
@@ -135,6 +292,9 @@ def profile(displacements, depth, direction, dose_dataset, plan_dataset):
     have gantry angle equal to 0 (head up). Depth is assumed to be
     purely in the y axis direction in DICOM coordinates.
 
+    Displacements which lie outside of the dose grid are given a dose of
+    zero, no error is raised.
+
     Parameters
     ----------
     displacements : numpy.ndarray
@@ -159,27 +319,9 @@ def profile(displacements, depth, direction, dose_dataset, plan_dataset):
         parameters and verify gantry angle 0 beams are used.
     """
 
-    orientation.require_dicom_patient_position(dose_dataset, "HFS")
-    require_gantries_be_zero(plan_dataset)
-    displacements = np.array(displacements, copy=False)
-
-    surface_entry_point = get_surface_entry_point_with_fallback(plan_dataset)
-    depth_adjust = surface_entry_point.y
-    y = [depth + depth_adjust]
-
-    if direction in ("inplane", "inline"):
-        coords = (displacements + surface_entry_point.z, y, [surface_entry_point.x])
-    elif direction in ("crossplane", "crossline"):
-        coords = ([surface_entry_point.z], y, displacements + surface_entry_point.x)
-    else:
-        raise ValueError(
-            "Expected direction to be equal to one of "
-            "'inplane', 'inline', 'crossplane', or 'crossline'"
-        )
-
-    extracted_dose = np.squeeze(dicom_dose_interpolate(coords, dose_dataset))
-
-    return extracted_dose
+    return DoseInterpolator(dose_dataset).profile(
+        displacements, depth, direction, plan_dataset
+    )
 
 
 def get_dose_grid_structure_mask(
@@ -218,81 +360,163 @@ def get_dose_grid_structure_mask(
         align with the structure planes.
 
     """
-    x_dose, y_dose, z_dose = xyz_axes_from_dataset(dose_dataset)
+    (x_dose, y_dose, z_dose), rasterized_slices = _rasterize_structure(
+        structure_name, structure_dataset, dose_dataset
+    )
+
+    mask_yxz = np.zeros((len(y_dose), len(x_dose), len(z_dose)), dtype=bool)
+
+    for dose_index, y_within, x_within, contour_mask in rasterized_slices:
+        # This logical "or" here is actually in place for the case where
+        # there may be multiple contours on the one slice. That's not
+        # going to be used at the moment however, as that case is not
+        # yet supported in the logic above.
+        mask_yxz[np.ix_(y_within, x_within, [dose_index])] |= contour_mask[:, :, None]
+
+    mask_xyz = np.swapaxes(mask_yxz, 0, 1)
+    mask_zyx = np.swapaxes(mask_xyz, 0, 2)
+
+    return mask_zyx
+
 
-    xx, yy = np.meshgrid(x_dose, y_dose)
-    points = np.swapaxes(np.vstack([xx.ravel(), yy.ravel()]), 0, 1)
+def _rasterize_structure(structure_name, structure_dataset, dose_dataset):
+    """Rasterise each of a structure's contours onto the dose grid.
+
+    Returns
+    -------
+    (x_dose, y_dose, z_dose)
+        The axes of the dose grid.
+    rasterized_slices : list of (dose_index, y_within, x_within, mask)
+        For each contour which overlaps the dose grid, the index of its
+        dose grid slice along with the output of `_rasterize_contour()`.
+        These are sorted by ``dose_index``.
+    """
+    x_dose, y_dose, z_dose = xyz_axes_from_dataset(dose_dataset)
 
     x_structure, y_structure, z_structure = pull_structure(
         structure_name, structure_dataset
     )
 
-    structure_z_values = []
+    contour_z_values = []
     for item in z_structure:
-        item = np.unique(item)
-        if len(item) != 1:
+        if np.any(item != item[0]):
             raise ValueError("Only one z value per contour supported")
-        structure_z_values.append(item[0])
+        contour_z_values.append(item[0])
 
-    structure_z_values = np.sort(structure_z_values)
-    unique_structure_z_values = np.unique(structure_z_values)
+    structure_z_values = np.sort(contour_z_values)
 
-    if np.any(structure_z_values != unique_structure_z_values):
+    if len(np.unique(structure_z_values)) != len(structure_z_values):
         raise ValueError("Only one contour per slice is currently supported")
 
     sorted_dose_z = np.sort(z_dose)
 
-    first_dose_index = np.where(sorted_dose_z == structure_z_values[0])[0][0]
-    for i, z_val in enumerate(structure_z_values):
-        dose_index = first_dose_index + i
-        if structure_z_values[i] != sorted_dose_z[dose_index]:
-            raise ValueError(
-                "Only contours where both, there are no gaps in the "
-                "z-axis of the contours, and the contour axis and dose "
-                "axis, are aligned are supported."
-            )
-
-    mask_yxz = np.zeros((len(y_dose), len(x_dose), len(z_dose)), dtype=bool)
-
-    for structure_index, z_val in enumerate(structure_z_values):
-        dose_index = int(np.where(z_dose == z_val)[0])
+    first_dose_index = np.searchsorted(sorted_dose_z, structure_z_values[0])
+    aligned_dose_z = sorted_dose_z[
+        first_dose_index : first_dose_index + len(structure_z_values)
+    ]
+    if not np.array_equal(structure_z_values, aligned_dose_z):
+        raise ValueError(
+            "Only contours where both, there are no gaps in the "
+            "z-axis of the contours, and the contour axis and dose "
+            "axis, are aligned are supported."
+        )
 
-        if z_structure[structure_index][0] != z_dose[dose_index]:
-            raise ValueError("Structure and dose indices do not align")
+    dose_index_by_z = {z_val: i for i, z_val in enumerate(z_dose)}
 
-        structure_polygon = matplotlib.path.Path(
-            [
-                (x_structure[structure_index][i], y_structure[structure_index][i])
-                for i in range(len(x_structure[structure_index]))
-            ]
+    def rasterize_contour(structure_index):
+        return _rasterize_contour(
+            x_structure[structure_index],
+            y_structure[structure_index],
+            x_dose,
+            y_dose,
         )
 
-        # This logical "or" here is actually in place for the case where
-        # there may be multiple contours on the one slice. That's not
-        # going to be used at the moment however, as that case is not
-        # yet supported in the logic above.
-        mask_yxz[:, :, dose_index] = mask_yxz[:, :, dose_index] | (
-            structure_polygon.contains_points(points).reshape(len(y_dose), len(x_dose))
+    # Each contour is rasterised independently so they are dispatched
+    # across threads, with the results gathered in order afterwards.
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        rasterized_contours = list(
+            executor.map(rasterize_contour, range(len(contour_z_values)))
         )
 
-    mask_xyz = np.swapaxes(mask_yxz, 0, 1)
-    mask_zyx = np.swapaxes(mask_xyz, 0, 2)
+    rasterized_slices = [
+        (dose_index_by_z[z_val], *rasterized_contour)
+        for z_val, rasterized_contour in zip(contour_z_values, rasterized_contours)
+        if rasterized_contour is not None
+    ]
+    rasterized_slices.sort(key=lambda rasterized_slice: rasterized_slice[0])
 
-    return mask_zyx
+    return (x_dose, y_dose, z_dose), rasterized_slices
+
+
+def _rasterize_contour(x_contour, y_contour, x_dose, y_dose):
+    """Determine which points of a dose grid plane lie within a contour.
+
+    Only the grid points within the bounding box of the contour can
+    possibly be inside of it, so only those are tested.
+
+    Returns
+    -------
+    (y_within, x_within, mask) or None
+        The row and column indices of the dose grid points within the
+        contour's bounding box along with the 2D boolean mask for those
+        points. ``None`` is returned if the contour lies entirely outside
+        of the dose grid.
+    """
+    xs = np.asarray(x_contour, dtype=np.float64)
+    ys = np.asarray(y_contour, dtype=np.float64)
+
+    x_within = np.flatnonzero((x_dose >= xs.min()) & (x_dose <= xs.max()))
+    y_within = np.flatnonzero((y_dose >= ys.min()) & (y_dose <= ys.max()))
+
+    if len(x_within) == 0 or len(y_within) == 0:
+        return None
+
+    x_axis = x_dose[x_within]
+    y_axis = y_dose[y_within]
+
+    # The scanline kernel requires the x axis to be ascending
+    x_descending = x_axis[0] > x_axis[-1]
+    if x_descending:
+        x_axis = x_axis[::-1].copy()
+
+    mask = np.zeros((len(y_within), len(x_within)), dtype=bool)
+    _scanline.scanline_fill(xs, ys, x_axis, y_axis, mask)
+
+    if x_descending:
+        mask = mask[:, ::-1]
+
+    return y_within, x_within, mask
 
 
 def find_dose_within_structure(structure_name, structure_dataset, dose_dataset):
+    """Extract the dose values at the dose grid points within a structure.
+
+    The values are gathered one contour at a time from within each
+    contour's bounding box, so the full 3D mask from
+    `get_dose_grid_structure_mask()` is never created. They are returned
+    in the same order as indexing the dose grid with that mask.
+    """
     dose = dose_from_dataset(dose_dataset)
-    mask = get_dose_grid_structure_mask(structure_name, structure_dataset, dose_dataset)
+    _, rasterized_slices = _rasterize_structure(
+        structure_name, structure_dataset, dose_dataset
+    )
 
-    return dose[mask]
+    if not rasterized_slices:
+        return np.empty(0, dtype=dose.dtype)
+
+    return np.concatenate(
+        [
+            dose[dose_index][np.ix_(y_within, x_within)][contour_mask]
+            for dose_index, y_within, x_within, contour_mask in rasterized_slices
+        ]
+    )
 
 
 def create_dvh(structure, structure_dataset, dose_dataset):
     structure_dose_values = find_dose_within_structure(
         structure, structure_dataset, dose_dataset
     )
-    hist = np.histogram(structure_dose_values, 100)
+    hist = np.histogram(structure_dose_values.astype(np.float32, copy=False), 100)
     freq = hist[0]
     bin_edge = hist[1]
     bin_mid = (bin_edge[1::] + bin_edge[:-1:]) / 2
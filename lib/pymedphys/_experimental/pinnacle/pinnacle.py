@@ -38,8 +38,12 @@
 # SOFTWARE.
 
 
+import concurrent.futures
+import copy
+import functools
 import logging
 import os
+import re
 import sys
 
 from .image import convert_image
@@ -50,6 +54,15 @@ from .rtdose import convert_dose
 from .rtplan import convert_plan
 from .rtstruct import convert_struct
 
+_DOB_SEPARATORS = re.compile(r"[-/ ]")
+
+
+@functools.lru_cache(maxsize=32)
+def _read_patient_file(path_patient, mtime):  # pylint: disable = unused-argument
+    # The modification time forms part of the cache key so that a
+    # Patient file which has changed on disk is read afresh.
+    return pinn_to_dict(path_patient)
+
 
 class PinnacleExport:
     """Handle Pinnacle data to allow export of DICOM objects
@@ -65,6 +78,15 @@ class PinnacleExport:
             Logger the tool will log to.
     """
 
+    __slots__ = (
+        "_logger",
+        "_path",
+        "_patient_info",
+        "_plans",
+        "_images",
+        "_images_by_series_uid",
+    )
+
     def __init__(self, path, logger=None):
 
         self._logger = logger  # Logger to use for all logging
@@ -75,6 +97,7 @@ class PinnacleExport:
         self._patient_info = None  # The patient data read from
         self._plans = None  # Pinnacle plans for this path
         self._images = None  # Images found in image.info
+        self._images_by_series_uid = None  # Images keyed by SeriesUID
 
         if not self._logger:
             self._logger = logging.getLogger(__name__)
@@ -115,7 +138,9 @@ class PinnacleExport:
         if not self._patient_info:
             path_patient = os.path.join(self._path, "Patient")
             self.logger.debug("Reading patient data from: %s", path_patient)
-            self._patient_info = pinn_to_dict(path_patient)
+            self._patient_info = copy.deepcopy(
+                _read_patient_file(path_patient, os.path.getmtime(path_patient))
+            )
 
             # Set the full patient name
             last_name = self._patient_info["LastName"]
@@ -123,20 +148,10 @@ class PinnacleExport:
             middle_name = self._patient_info["MiddleName"]
             self._patient_info["FullName"] = f"{last_name}^{first_name}^{middle_name}^"
 
-            # gets birthday string with numbers and dashes
+            # gets birthday string with numbers and dashes, zero padding
+            # each of the day and month
             dobstr = self._patient_info["DateOfBirth"]
-            if "-" in dobstr:
-                dob_list = dobstr.split("-")
-            elif "/" in dobstr:
-                dob_list = dobstr.split("/")
-            else:
-                dob_list = dobstr.split(" ")
-
-            dob = ""
-            for num in dob_list:
-                if len(num) == 1:
-                    num = f"0{num}"
-                dob = f"{dob}{num}"
+            dob = "".join(num.zfill(2) for num in _DOB_SEPARATORS.split(dobstr) if num)
 
             self._patient_info["DOB"] = dob
 
@@ -176,16 +191,42 @@ class PinnacleExport:
 
         # Read patient info to populate patients images
         if not self._images:
-            self._images = []
-            for image in self.patient_info["ImageSetList"]:
-                pi = PinnacleImage(self, self._path, image)
+            images = [
+                PinnacleImage(self, self._path, image)
+                for image in self.patient_info["ImageSetList"]
+            ]
 
-                # Check that image info exists to ensure the image is really available
-                if pi.image_info:
-                    self._images.append(pi)
+            # Reading each ImageInfo file is I/O bound, so they are read
+            # concurrently. The map preserves the order of the images.
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                image_infos = list(executor.map(lambda pi: pi.image_info, images))
+
+            # Check that image info exists to ensure the image is really available
+            self._images = [
+                pi for pi, image_info in zip(images, image_infos) if image_info
+            ]
 
         return self._images
 
+    @property
+    def images_by_series_uid(self):
+        """Get the images available keyed by their SeriesUID.
+
+        Returns
+        -------
+        images_by_series_uid : dict
+            Dictionary mapping each SeriesUID to its PinnacleImage.
+        """
+
+        if self._images_by_series_uid is None:
+            # Iterate in reverse so that the first image wins should two
+            # images share a SeriesUID.
+            self._images_by_series_uid = {
+                im.image_info[0]["SeriesUID"]: im for im in reversed(self.images)
+            }
+
+        return self._images_by_series_uid
+
     @staticmethod
     def export_struct(plan, export_path=".", skip_pattern="^$"):
         """Exports the RTSTRUCT DICOM modality.
@@ -254,12 +295,26 @@ class PinnacleExport:
         if not image and not series_uid:
             self.logger.error("No image to export")
 
-        for im in self.images:
-            im_info = im.image_info[0]
-            im_suid = im_info["SeriesUID"]
-            if len(series_uid) > 0 and im_suid == series_uid:
-                convert_image(im, export_path)
-                break
+        if len(series_uid) > 0:
+            if self._images:
+                im = self.images_by_series_uid.get(series_uid)
+                if im:
+                    convert_image(im, export_path)
+            else:
+                # Unless the images have already been loaded, only read
+                # the ImageInfo files up until the one with a matching
+                # series.
+                for im in (
+                    PinnacleImage(self, self._path, image)
+                    for image in self.patient_info["ImageSetList"]
+                ):
+                    if not im.image_info:
+                        continue
+
+                    im_suid = im.image_info[0]["SeriesUID"]
+                    if im_suid == series_uid:
+                        convert_image(im, export_path)
+                        break
 
         if image:
             convert_image(image, export_path)
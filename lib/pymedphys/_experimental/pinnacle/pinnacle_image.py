@@ -58,6 +58,15 @@ class PinnacleImage:
             Image info dict from 'Patient' file.
     """
 
+    __slots__ = (
+        "_pinnacle",
+        "_path",
+        "_image",
+        "_image_info",
+        "_image_header",
+        "_image_set",
+    )
+
     def __init__(self, pinnacle, path, image):
 
         self._pinnacle = pinnacle
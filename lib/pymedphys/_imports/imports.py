@@ -12,6 +12,7 @@ import interpolation
 import interpolation.splines
 import keyring
 import natsort
+import numba
 import packaging
 import psutil
 import pymssql
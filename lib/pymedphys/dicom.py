@@ -5,6 +5,7 @@
 
 from ._dicom.anonymise import anonymise_dataset as anonymise
 from ._dicom.dose import (
+    DoseInterpolator,
     depth_dose,
     dicom_dose_interpolate,
     profile,
@@ -14,11 +14,17 @@
 
 import pytest
 from pymedphys._imports import numpy as np
-from pymedphys._imports import shapely
+from pymedphys._imports import matplotlib, plt, shapely
 
+from pymedphys._dicom._scanline import scanline_fill
 from pymedphys._dicom.coords import xyz_axes_from_dataset
 from pymedphys._dicom.create import dicom_dataset_from_dict
-from pymedphys._dicom.dose import get_dose_grid_structure_mask
+from pymedphys._dicom.dose import (
+    create_dvh,
+    dose_from_dataset,
+    find_dose_within_structure,
+    get_dose_grid_structure_mask,
+)
 
 
 @pytest.mark.pydicom
@@ -73,6 +79,109 @@ def test_structure_dose_mask():
         )
 
 
+@pytest.mark.pydicom
+def test_structure_dose_mask_contour_order():
+    x_grid = np.arange(-3, 2, 0.1)
+    y_grid = np.arange(-1, 4, 0.2)
+
+    contour_name = "rectangle"
+    structure_dataset, dose_dataset = _convert_contours_to_dummy_dicom_files(
+        x_grid, y_grid, [0, 0, 1, 1], [0, 2, 2, 0], [0, 1, 2], contour_name
+    )
+    expected_mask = get_dose_grid_structure_mask(
+        contour_name, structure_dataset, dose_dataset
+    )
+
+    contour_sequence = structure_dataset.ROIContourSequence[0].ContourSequence
+    contour_sequence.reverse()
+
+    assert np.array_equal(
+        get_dose_grid_structure_mask(contour_name, structure_dataset, dose_dataset),
+        expected_mask,
+    )
+
+
+@pytest.mark.pydicom
+def test_find_dose_within_structure_matches_mask():
+    rng = np.random.default_rng(1)
+
+    x_grid = np.arange(-3, 2, 0.1)
+    y_grid = np.arange(-1, 4, 0.2)
+    contour_z = [0, 1, 2, 3]
+
+    contour_name = "polygons"
+    structure_dataset, dose_dataset = _convert_contours_to_dummy_dicom_files(
+        x_grid, y_grid, [0, 0, 1, 1], [0, 2, 2, 0], contour_z, contour_name
+    )
+
+    # Give each slice a differently shaped contour and store the
+    # contours out of z order
+    contour_sequence = structure_dataset.ROIContourSequence[0].ContourSequence
+    for contour, z in zip(contour_sequence, contour_z):
+        theta = np.sort(rng.uniform(0, 2 * np.pi, 8))
+        radius = rng.uniform(0.5, 1.5, 8)
+        xs = -0.5 + radius * np.cos(theta)
+        ys = 1.5 + radius * np.sin(theta)
+
+        contour.ContourData = (
+            np.column_stack((xs, ys, np.full_like(xs, z))).ravel().tolist()
+        )
+
+    shuffled = [contour_sequence[i] for i in (2, 0, 3, 1)]
+    structure_dataset.ROIContourSequence[0].ContourSequence = shuffled
+
+    data = rng.integers(0, 60000, size=(len(contour_z), len(y_grid), len(x_grid)))
+    _add_dose_pixel_data(dose_dataset, data, 3.7e-5)
+
+    mask = get_dose_grid_structure_mask(contour_name, structure_dataset, dose_dataset)
+    expected = dose_from_dataset(dose_dataset)[mask]
+    assert np.all(np.any(mask, axis=(1, 2)))
+
+    dose_values = find_dose_within_structure(
+        contour_name, structure_dataset, dose_dataset
+    )
+    assert np.array_equal(dose_values, expected)
+
+    plt.figure()
+    try:
+        create_dvh(contour_name, structure_dataset, dose_dataset)
+        _, percent_cumulative = plt.gca().lines[-1].get_data()
+    finally:
+        plt.close()
+
+    freq, _ = np.histogram(expected, 100)
+    expected_percent_cumulative = np.cumsum(freq[::-1])[::-1] / len(expected) * 100
+
+    assert percent_cumulative[0] == 100
+    assert np.allclose(percent_cumulative[1:], expected_percent_cumulative)
+
+
+def test_scanline_fill_matches_matplotlib():
+    rng = np.random.default_rng(0)
+    x_axis = np.linspace(-20, 20, 93)
+    y_axis = np.linspace(-15, 25, 71)
+
+    xx, yy = np.meshgrid(x_axis, y_axis)
+    points = np.column_stack((xx.ravel(), yy.ravel()))
+
+    for num_vertices in (3, 12, 60):
+        theta = np.sort(rng.uniform(0, 2 * np.pi, num_vertices))
+        radius = rng.uniform(2, 18, num_vertices)
+        xs = 1 + radius * np.cos(theta)
+        ys = 4 + radius * np.sin(theta)
+
+        expected = (
+            matplotlib.path.Path(np.column_stack((xs, ys)))
+            .contains_points(points)
+            .reshape(xx.shape)
+        )
+
+        mask = np.zeros(xx.shape, dtype=bool)
+        scanline_fill(xs, ys, x_axis, y_axis, mask)
+
+        assert np.array_equal(mask, expected)
+
+
 def _get_grid_spacing(array):
     dx = np.unique(np.round(np.diff(array), 4))
     assert len(dx) == 1
@@ -106,11 +215,7 @@ def _convert_contours_to_dummy_dicom_files(
             "ROIContourSequence": [
                 {
                     "ReferencedROINumber": 1,
-                    "ContourSequence": [
-                        {"ContourData": contour_data[0]},
-                        {"ContourData": contour_data[1]},
-                        {"ContourData": contour_data[2]},
-                    ],
+                    "ContourSequence": [{"ContourData": item} for item in contour_data],
                 }
             ],
         }
@@ -137,6 +242,18 @@ def _convert_contours_to_dummy_dicom_files(
     return structure_dataset, dose_dataset
 
 
+def _add_dose_pixel_data(dose_dataset, data, scale):
+    dose_dataset.BitsAllocated = 32
+    dose_dataset.BitsStored = 32
+    dose_dataset.NumberOfFrames = data.shape[0]
+    dose_dataset.PixelRepresentation = 0
+    dose_dataset.SamplesPerPixel = 1
+    dose_dataset.PhotometricInterpretation = "MONOCHROME2"
+    dose_dataset.PixelData = data.astype(np.uint32).tobytes()
+    dose_dataset.DoseGridScaling = scale
+    dose_dataset.fix_meta_info(enforce_standard=False)
+
+
 def _create_shapely_points(xx, yy):
     xx_flat, yy_flat = xx.ravel(), yy.ravel()
     points = shapely.geometry.MultiPoint(list(zip(xx_flat, yy_flat)))
@@ -14,14 +14,18 @@
 
 """ A test suite for the DICOM RT Dose toolbox."""
 
+# pylint: disable = protected-access
+
+import concurrent.futures
 import copy
+import gc
 import json
 from os.path import abspath, dirname
 from os.path import join as pjoin
 from zipfile import ZipFile
 
 from pymedphys._imports import numpy as np
-from pymedphys._imports import pydicom, pytest
+from pymedphys._imports import pydicom, pytest, scipy
 
 import pymedphys
 from pymedphys._data import download
@@ -204,3 +208,196 @@ def test_sum_doses_in_datasets():
         ds2.ImagePositionPatient = [-1, -1.1, -1]
         dose.sum_doses_in_datasets([ds1, ds2])
     ds2.ImagePositionPatient = [-1, -1, -1]
+
+
+def _create_dose_dataset(data, scale, pixel_spacing, grid_frame_offset_vector):
+    ds = create.dicom_dataset_from_dict(
+        {
+            "PatientID": "PMP",
+            "Modality": "RTDOSE",
+            "SOPInstanceUID": pydicom.uid.generate_uid(),
+            "ImagePositionPatient": [-5.0, -4.0, -3.0],
+            "ImageOrientationPatient": [1, 0, 0, 0, 1, 0],
+            "BitsAllocated": 32,
+            "BitsStored": 32,
+            "NumberOfFrames": data.shape[0],
+            "Rows": data.shape[1],
+            "Columns": data.shape[2],
+            "PixelRepresentation": 0,
+            "SamplesPerPixel": 1,
+            "PhotometricInterpretation": "MONOCHROME2",
+            "PixelSpacing": pixel_spacing,
+            "GridFrameOffsetVector": grid_frame_offset_vector,
+            "PixelData": data.astype(np.uint32).tobytes(),
+            "DoseGridScaling": scale,
+            "DoseSummationType": "PLAN",
+            "DoseType": "PHYSICAL",
+            "DoseUnits": "GY",
+        }
+    )
+    ds.fix_meta_info(enforce_standard=False)
+
+    return ds
+
+
+@pytest.mark.pydicom
+def test_dicom_dose_interpolate():
+    rng = np.random.default_rng(42)
+    data = rng.integers(0, 10000, size=(4, 5, 6))
+
+    for grid_frame_offset_vector in ([0, 2, 4, 6], [0, 1, 3, 6]):
+        ds = _create_dose_dataset(data, 1e-3, [1.5, 2.0], grid_frame_offset_vector)
+        coords, dose_grid = dose.zyx_and_dose_from_dataset(ds)
+
+        interp_coords = tuple(
+            np.sort(rng.uniform(np.min(axis), np.max(axis), size=7)) for axis in coords
+        )
+        expected = scipy.interpolate.RegularGridInterpolator(coords, dose_grid)(
+            tuple(np.meshgrid(*interp_coords, indexing="ij"))
+        )
+
+        result = dose.dicom_dose_interpolate(interp_coords, ds)
+        assert result.shape == (7, 7, 7)
+        assert np.allclose(result, expected)
+
+        interpolator = pymedphys.dicom.DoseInterpolator(ds)
+        assert np.allclose(interpolator(interp_coords), expected)
+        assert np.allclose(interpolator(coords), dose_grid)
+
+        # The grid boundaries themselves are within bounds
+        assert np.allclose(
+            dose.dicom_dose_interpolate(coords, ds), dose_grid.astype(np.float64)
+        )
+
+        # Points outside of the dose grid are filled with zero
+        x_outside = np.concatenate(
+            [[np.min(coords[2]) - 0.1], coords[2], [np.max(coords[2]) + 0.1]]
+        )
+        result = dose.dicom_dose_interpolate((coords[0], coords[1], x_outside), ds)
+        assert np.all(result[:, :, [0, -1]] == 0)
+        assert np.allclose(result[:, :, 1:-1], dose_grid)
+
+
+@pytest.mark.pydicom
+def test_dose_from_dataset_cache():
+    data = np.arange(4 * 5 * 6).reshape((4, 5, 6))
+    ds = _create_dose_dataset(data, 1e-2, [1.0, 1.0], [0, 1, 2, 3])
+
+    first = dose.dose_from_dataset(ds)
+    assert first.dtype == np.float32
+    assert not first.flags.writeable
+    assert np.allclose(first, data * 1e-2)
+    assert dose.dose_from_dataset(ds) is first
+
+    ds.PixelData = (2 * data).astype(np.uint32).tobytes()
+    assert np.allclose(dose.dose_from_dataset(ds), 2 * data * 1e-2)
+
+    ds.DoseGridScaling = 1e-3
+    assert np.allclose(dose.dose_from_dataset(ds), 2 * data * 1e-3)
+
+    # The public API returns a writeable copy
+    _, dose_grid = dose.zyx_and_dose_from_dataset(ds)
+    assert dose_grid.dtype == np.float64
+    assert dose_grid.flags.writeable
+    dose_grid[dose_grid < 0.1] = 0
+    assert np.allclose(dose.dose_from_dataset(ds), 2 * data * 1e-3)
+
+    # The cached grid does not outlive its dataset
+    key = id(ds)
+    assert key in dose._DOSE_CACHE
+    del ds
+    gc.collect()
+    assert key not in dose._DOSE_CACHE
+
+
+@pytest.mark.pydicom
+def test_dose_interpolator_depth_dose_and_profile():
+    # A dose which varies linearly along each axis is reproduced exactly
+    # by trilinear interpolation.
+    zz, yy, xx = np.meshgrid(np.arange(4), np.arange(5), np.arange(6), indexing="ij")
+    data = 1000 + 100 * zz + 10 * yy + xx
+
+    ds = _create_dose_dataset(data, 1e-2, [1.0, 1.0], [0, 1, 2, 3])
+    ds.PatientPosition = "HFS"
+
+    # The grid origin is at (x, y, z) = (-5, -4, -3)
+    def expected_dose(x, y, z):
+        return (1000 + 100 * (z + 3) + 10 * (y + 4) + (x + 5)) * 1e-2
+
+    plan = create.dicom_dataset_from_dict(
+        {
+            "BeamSequence": [
+                {
+                    "ControlPointSequence": [
+                        {"GantryAngle": 0, "SurfaceEntryPoint": [-3.0, -4.0, -2.0]}
+                    ]
+                }
+            ]
+        }
+    )
+
+    interpolator = pymedphys.dicom.DoseInterpolator(ds)
+
+    depths = np.array([0, 0.5, 2.25, 4])
+    expected_depth_dose = expected_dose(-3.0, -4.0 + depths, -2.0)
+    assert np.allclose(interpolator.depth_dose(depths, plan), expected_depth_dose)
+    assert np.allclose(
+        pymedphys.dicom.depth_dose(depths, ds, plan), expected_depth_dose
+    )
+
+    displacements = np.array([-2, -0.5, 1, 2.5])
+    expected_profile = expected_dose(-3.0 + displacements, -3.0, -2.0)
+    assert np.allclose(
+        interpolator.profile(displacements, 1, "crossplane", plan), expected_profile
+    )
+    assert np.allclose(
+        pymedphys.dicom.profile(displacements, 1, "crossline", ds, plan),
+        expected_profile,
+    )
+
+    with pytest.raises(ValueError):
+        interpolator.profile(displacements, 1, "diagonal", plan)
+
+
+@pytest.mark.pydicom
+def test_dicom_dose_interpolate_scattered_points():
+    rng = np.random.default_rng(7)
+    data = rng.integers(0, 10000, size=(4, 5, 6))
+
+    ds = _create_dose_dataset(data, 1e-3, [1.5, 2.0], [0, 2, 4, 6])
+    coords, _ = dose.zyx_and_dose_from_dataset(ds)
+
+    interp_axes = tuple(
+        np.sort(rng.uniform(np.min(axis), np.max(axis), size=5)) for axis in coords
+    )
+    grid_result = dose.dicom_dose_interpolate(interp_axes, ds)
+
+    mesh = np.meshgrid(*interp_axes, indexing="ij")
+    assert np.allclose(dose.dicom_dose_interpolate(mesh, ds), grid_result)
+
+    scattered = tuple(item.ravel() for item in mesh)
+    assert np.allclose(
+        dose.dicom_dose_interpolate([item[:, None] for item in scattered], ds),
+        grid_result.reshape(-1, 1),
+    )
+
+
+@pytest.mark.pydicom
+def test_dose_interpolator_concurrent_calls():
+    rng = np.random.default_rng(7)
+    data = rng.integers(0, 10000, size=(10, 12, 14))
+    ds = _create_dose_dataset(data, 1e-3, [1.0, 1.0], list(range(10)))
+
+    interpolator = pymedphys.dicom.DoseInterpolator(ds)
+    interp_coords = (
+        np.linspace(-3, 6, 9),
+        np.linspace(-4, 7, 11),
+        np.linspace(-5, 8, 13),
+    )
+    expected = interpolator(interp_coords)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: interpolator(interp_coords), range(64)))
+
+    for result in results:
+        assert np.array_equal(result, expected)